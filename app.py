@@ -1,16 +1,11 @@
-import pandas as pd
+import hashlib
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 import streamlit as st
-from core.report import generate_sanad_report, now_date_str
-from core.review import (
-    climate_voltage_check,
-    compare_bom_vs_sld,
-    extract_bom_signals,
-    saudi_standards_snapshot,
-    try_extract_from_sld,
-)
-from core.stage2 import render_stage2
-from core.state import init_state, reset_all
+from core.review import extract_bom_signals
+from core.state import init_state, reset_all, save_upload, stage1_ready
 from core.theme import apply_theme
 from core.ui_components import header, render_map, weather_summary
 from core.weather import fetch_current_temp, fetch_design_tmin, geocode_list
@@ -42,6 +37,11 @@ def status_badge(level: str) -> str:
     return '<span class="sg-chip">INFO</span>'
 
 
+def _place_label(it: dict) -> str:
+    name, admin1, country = it.get("name"), it.get("admin1"), it.get("country")
+    return f"{name}, {admin1}, {country}" if admin1 else f"{name}, {country}"
+
+
 def level_to_streamlit(level: str):
     if level == "PASS":
         return st.success
@@ -52,175 +52,256 @@ def level_to_streamlit(level: str):
     return st.info
 
 
+@st.cache_data(ttl=86_400, show_spinner=False)
+def _geocode_cached(q: str, count: int):
+    return geocode_list(q, count=count)
 
-if st.session_state["stage"] == 1:
-    left, right = st.columns([1.05, 0.95], gap="large")
 
- 
-    with left:
-        st.markdown('<div class="sg-h2">Site selection</div>', unsafe_allow_html=True)
+PLACEHOLDER_CITIES = ("NEOM", "Tabuk", "Riyadh", "Jeddah", "Makkah")
 
-        q = st.text_input(
-            "Search (city / region)", placeholder="NEOM, Tabuk, Riyadh, Jeddah, Makkah"
-        )
 
-        a, b = st.columns([1, 1])
-        with a:
-            st.markdown('<div class="sg-btn-primary">', unsafe_allow_html=True)
-            if st.button("Search", use_container_width=True, type="secondary"):
-                if not q.strip():
-                    st.warning("Enter a city/region name.")
-                else:
-                    try:
-                        st.session_state["geo_results"] = geocode_list(
-                            q.strip(), count=5
-                        )
-                    except Exception as e:
-                        st.session_state["geo_results"] = None
-                        st.error(f"Search failed: {e}")
-            st.markdown("</div>", unsafe_allow_html=True)
-
-        with b:
-            st.markdown('<div class="sg-btn-ghost">', unsafe_allow_html=True)
-            if st.button("Reset", use_container_width=True):
-                reset_all()
-                st.session_state["stage"] = 1
-                st.rerun()
-            st.markdown("</div>", unsafe_allow_html=True)
-
-        results = st.session_state.get("geo_results") or []
-        options = []
-        for it in results:
-            name = it.get("name")
-            admin1 = it.get("admin1")
-            country = it.get("country")
-            label = f"{name}, {admin1}, {country}" if admin1 else f"{name}, {country}"
-            options.append(label)
-
-        selected_idx = None
-        if options:
-            selected_label = st.selectbox(
-                "Select result", options, index=0, label_visibility="collapsed"
-            )
-            selected_idx = options.index(selected_label)
-
-        # Preview location on map
-        if selected_idx is not None:
-            it = results[selected_idx]
-            preview_lat = float(it.get("latitude"))
-            preview_lon = float(it.get("longitude"))
-            name = it.get("name")
-            admin1 = it.get("admin1")
-            country = it.get("country")
-            preview_place = (
-                f"{name}, {admin1}, {country}" if admin1 else f"{name}, {country}"
-            )
-            zoom = 7
-        elif (
-            st.session_state.get("lat") is not None
-            and st.session_state.get("lon") is not None
-        ):
-            preview_lat = float(st.session_state["lat"])
-            preview_lon = float(st.session_state["lon"])
-            preview_place = st.session_state.get("place")
-            zoom = 7
-        else:
-            preview_lat, preview_lon = 24.7136, 46.6753
-            preview_place = None
-            zoom = 5
-
-        # Smaller map (no background box)
-        render_map(preview_lat, preview_lon, preview_place, height=320, zoom=zoom)
-
-        # Set site
-        st.markdown('<div class="sg-btn-clean">', unsafe_allow_html=True)
-        if st.button(
-            "Set site", use_container_width=True, disabled=(selected_idx is None)
-        ):
-            it = results[selected_idx]
-            lat = float(it.get("latitude"))
-            lon = float(it.get("longitude"))
-            name = it.get("name")
-            admin1 = it.get("admin1")
-            country = it.get("country")
-            place = f"{name}, {admin1}, {country}" if admin1 else f"{name}, {country}"
-
-            st.session_state["place"] = place
-            st.session_state["lat"] = lat
-            st.session_state["lon"] = lon
+def _warm_geocode_cache():
+    for city in PLACEHOLDER_CITIES:
+        try:
+            _geocode_cached(city.casefold(), 5)
+        except Exception:
+            pass
 
-            try:
-                st.session_state["current_temp"] = fetch_current_temp(lat, lon)
-            except Exception:
-                st.session_state["current_temp"] = None
 
-            try:
-                tmin, method = fetch_design_tmin(lat, lon, years=10)
-                st.session_state["tmin"] = tmin
-                st.session_state["tmin_method"] = method
-            except Exception:
-                st.session_state["tmin"] = None
-                st.session_state["tmin_method"] = "Archive: failed to derive Tmin"
+# Once per server process: warm the searches users type most, in the
+# background so the first page load does not wait on them.
+@st.cache_resource(show_spinner=False)
+def _prefetch_placeholder_cities():
+    t = threading.Thread(target=_warm_geocode_cache, daemon=True)
+    t.start()
+    return t
+
+
+# ~1 km grid; nearby picks of the same site share one upstream request
+@st.cache_data(ttl=3600, show_spinner=False)
+def _current_cached(lat_r: float, lon_r: float):
+    return fetch_current_temp(lat_r, lon_r)
+
+
+@st.cache_data(ttl=86_400 * 7, show_spinner=False)
+def _climate_cached(lat_r: float, lon_r: float, years: int):
+    return fetch_design_tmin(lat_r, lon_r, years=years)
+
 
+# Keyed on a digest of the file; the leading underscore keeps Streamlit
+# from hashing the raw bytes again. Only the first sheet is read; all of
+# its columns are kept so the preview shows the BoM as uploaded.
+@st.cache_data(max_entries=32, show_spinner=False)
+def _read_excel_cached(key: str, _data: bytes):
+    # pandas is only needed once a BoM is uploaded; keep it off cold start
+    import pandas as pd
+
+    try:
+        return pd.read_excel(io.BytesIO(_data), sheet_name=0, engine="calamine")
+    except ImportError:
+        # python-calamine missing: fall back to pandas' default engine
+        return pd.read_excel(io.BytesIO(_data), sheet_name=0)
+
+
+# Signals the review needs from the BoM; an unmatched header means the
+# review silently uses a default value, so Stage 1 calls it out.
+_BOM_SIGNAL_LABELS = (
+    ("voc_source", "Voc (STC)"),
+    ("tc_source", "Voc temperature coefficient"),
+    ("mps_source", "Modules per string"),
+    ("vmax_source", "Inverter DC max voltage"),
+)
+
+
+# Each Stage 1 panel is a fragment: searching, picking a result or
+# uploading a file reruns only that panel. Actions that change what the
+# other panel shows (Set site, Reset, Continue) still call st.rerun(),
+# which reruns the full app.
+@st.fragment
+def _site_panel():
+    st.markdown('<div class="sg-h2">Site selection</div>', unsafe_allow_html=True)
+
+    q = st.text_input(
+        "Search (city / region)", placeholder=", ".join(PLACEHOLDER_CITIES)
+    )
+
+    a, b = st.columns([1, 1])
+    with a:
+        st.markdown('<div class="sg-btn-primary">', unsafe_allow_html=True)
+        if st.button("Search", use_container_width=True, type="secondary"):
+            if not q.strip():
+                st.warning("Enter a city/region name.")
+            else:
+                try:
+                    st.session_state["geo_results"] = _geocode_cached(
+                        q.strip().casefold(), 5
+                    )
+                except Exception as e:
+                    st.session_state["geo_results"] = None
+                    st.error(f"Search failed: {e}")
+        st.markdown("</div>", unsafe_allow_html=True)
+
+    with b:
+        st.markdown('<div class="sg-btn-ghost">', unsafe_allow_html=True)
+        if st.button("Reset", use_container_width=True):
+            reset_all()
+            st.session_state["stage"] = 1
             st.rerun()
         st.markdown("</div>", unsafe_allow_html=True)
 
-   
-    # Inputs + Weather
-    
-    with right:
-        st.markdown('<div class="sg-h2">Input documents</div>', unsafe_allow_html=True)
+    results = st.session_state.get("geo_results") or []
+    # label -> result (first hit wins for duplicate labels)
+    by_label = {}
+    for it in results:
+        by_label.setdefault(_place_label(it), it)
 
-        sld = st.file_uploader("Single-Line Diagram (PDF)", type=["pdf"])
-        bom = st.file_uploader("Bill of Materials (Excel)", type=["xlsx", "xls"])
+    selected_label = None
+    if by_label:
+        selected_label = st.selectbox(
+            "Select result", list(by_label), index=0, label_visibility="collapsed"
+        )
+    selected = by_label.get(selected_label)
+
+    # Preview location on map
+    if selected is not None:
+        preview_lat = float(selected.get("latitude"))
+        preview_lon = float(selected.get("longitude"))
+        preview_place = selected_label
+        zoom = 7
+    elif (
+        st.session_state.get("lat") is not None
+        and st.session_state.get("lon") is not None
+    ):
+        preview_lat = float(st.session_state["lat"])
+        preview_lon = float(st.session_state["lon"])
+        preview_place = st.session_state.get("place")
+        zoom = 7
+    else:
+        preview_lat, preview_lon = 24.7136, 46.6753
+        preview_place = None
+        zoom = 5
+
+    # Smaller map (no background box)
+    render_map(preview_lat, preview_lon, preview_place, height=320, zoom=zoom)
+
+    # Set site
+    st.markdown('<div class="sg-btn-clean">', unsafe_allow_html=True)
+    if st.button(
+        "Set site", use_container_width=True, disabled=(selected is None)
+    ):
+        lat = float(selected.get("latitude"))
+        lon = float(selected.get("longitude"))
+
+        st.session_state["place"] = selected_label
+        st.session_state["lat"] = lat
+        st.session_state["lon"] = lon
+
+        lat_r, lon_r = round(lat, 2), round(lon, 2)
+
+        # Both lookups are independent HTTP calls; run them side by side
+        with ThreadPoolExecutor(max_workers=2) as ex:
+            fut_cur = ex.submit(_current_cached, lat_r, lon_r)
+            fut_cli = ex.submit(_climate_cached, lat_r, lon_r, 10)
+
+        try:
+            st.session_state["current_temp"] = fut_cur.result()
+        except Exception:
+            st.session_state["current_temp"] = None
+
+        try:
+            tmin, method = fut_cli.result()
+            st.session_state["tmin"] = tmin
+            st.session_state["tmin_method"] = method
+        except Exception:
+            st.session_state["tmin"] = None
+            st.session_state["tmin_method"] = "Archive: failed to derive Tmin"
+
+        st.rerun()
+    st.markdown("</div>", unsafe_allow_html=True)
+
+
+@st.fragment
+def _inputs_panel():
+    st.markdown('<div class="sg-h2">Input documents</div>', unsafe_allow_html=True)
+
+    sld = st.file_uploader("Single-Line Diagram (PDF)", type=["pdf"])
+    bom = st.file_uploader("Bill of Materials (Excel)", type=["xlsx", "xls"])
 
-        if sld is not None:
-            st.session_state["sld_pdf_name"] = sld.name
-            st.session_state["sld_pdf_bytes"] = sld.getvalue()
+    if sld is not None:
+        save_upload("sld_pdf", sld)
 
-        if bom is not None:
-            st.session_state["bom_name"] = bom.name
+    if bom is not None:
+        st.session_state["bom_name"] = bom.name
+        try:
+            data = bom.getvalue()
+            digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+            df = _read_excel_cached(digest, data)
+        except Exception as e:
+            df = None
+            st.session_state["bom_df"] = None
+            st.error(f"Failed to read Excel: {e}")
+
+        if df is not None:
+            # the workbook itself is fine from here on; only the signal
+            # cells can still be unusable (e.g. "49.5 V")
             try:
-                df = pd.read_excel(bom)
+                meta = extract_bom_signals(df)["meta"]
+            except ValueError as e:
+                st.session_state["bom_df"] = None
+                st.error(f"BoM read, but it cannot be reviewed: {e}")
+            else:
                 st.session_state["bom_df"] = df
                 st.success("BoM loaded successfully.")
-                with st.expander("Preview (first 10 rows)"):
-                    st.dataframe(df.head(10), use_container_width=True)
-            except Exception as e:
-                st.session_state["bom_df"] = None
-                st.error(f"Failed to read Excel: {e}")
+                defaulted = [
+                    label
+                    for source, label in _BOM_SIGNAL_LABELS
+                    if meta[source] == "DEFAULT"
+                ]
+                if defaulted:
+                    st.warning(
+                        "No matching column for: "
+                        + ", ".join(defaulted)
+                        + ". The review will use default values for these; "
+                        "check the BoM headers."
+                    )
+            with st.expander("Preview (first 10 rows)"):
+                st.dataframe(df.head(10), use_container_width=True)
+
+    st.markdown('<div class="sg-divider"></div>', unsafe_allow_html=True)
+
+    weather_summary(
+        st.session_state.get("place"),
+        st.session_state.get("current_temp"),
+        st.session_state.get("tmin"),
+        st.session_state.get("tmin_method"),
+    )
 
-        st.markdown('<div class="sg-divider"></div>', unsafe_allow_html=True)
+    st.markdown("<br>", unsafe_allow_html=True)
 
-        weather_summary(
-            st.session_state.get("place"),
-            st.session_state.get("current_temp"),
-            st.session_state.get("tmin"),
-            st.session_state.get("tmin_method"),
-        )
+    ready = stage1_ready()
 
-        st.markdown("<br>", unsafe_allow_html=True)
-
-        ready = all(
-            [
-                st.session_state.get("place"),
-                st.session_state.get("lat") is not None,
-                st.session_state.get("lon") is not None,
-                st.session_state.get("tmin") is not None,
-                st.session_state.get("sld_pdf_bytes") is not None,
-                st.session_state.get("bom_df") is not None,
-            ]
-        )
+    st.markdown('<div class="sg-btn-primary">', unsafe_allow_html=True)
+    if st.button(
+        "Continue",
+        use_container_width=True,
+        disabled=not ready,
+    ):
+        st.session_state["stage"] = 2
+        st.rerun()
+    st.markdown("</div>", unsafe_allow_html=True)
 
-        st.markdown('<div class="sg-btn-primary">', unsafe_allow_html=True)
-        if st.button(
-            "Continue",
-            use_container_width=True,
-            disabled=not ready,
-        ):
-            st.session_state["stage"] = 2
-            st.rerun()
-        st.markdown("</div>", unsafe_allow_html=True)
+
+_prefetch_placeholder_cities()
+
+if st.session_state["stage"] == 1:
+    left, right = st.columns([1.05, 0.95], gap="large")
+
+    with left:
+        _site_panel()
+
+    # Inputs + Weather
+    with right:
+        _inputs_panel()
 
 
 elif st.session_state["stage"] == 2:
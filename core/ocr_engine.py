@@ -1,7 +1,76 @@
+import functools
 import json
+import threading
 from pathlib import Path
 
 import cv2
+import numpy as np
+
+# Building a reader loads model weights from disk (seconds, hundreds of MB).
+# Each one is built once per process and shared across calls and Streamlit
+# sessions; the lock keeps concurrent first calls from building it twice.
+_MODEL_LOCK = threading.Lock()
+
+# Sessions run in separate threads and share the cached PaddleOCR readers,
+# whose inference is not thread-safe; calls into Paddle go one at a time.
+_PADDLE_INFER_LOCK = threading.Lock()
+
+# Optional backends whose import already failed in this process; later calls
+# fall back straight to EasyOCR instead of re-searching sys.path.
+_MISSING_BACKENDS: set[str] = set()
+
+# Only small images are upscaled before EasyOCR up front; large scans are
+# read at native size first, since a 2x upscale quadruples the pixels. If
+# that read comes back thin or unsure (tiny SLD labels), it is retried
+# upscaled.
+_UPSCALE_BELOW_PX = 2000
+_RETRY_MIN_RESULTS = 5
+_RETRY_MIN_MEAN_CONF = 0.5
+
+
+@functools.lru_cache(maxsize=4)
+def _easy_reader(langs: tuple):
+    import easyocr
+
+    return easyocr.Reader(list(langs), gpu=False)
+
+
+@functools.lru_cache(maxsize=2)
+def _paddle_ocr(lang: str):
+    from paddleocr import PaddleOCR
+
+    return PaddleOCR(use_angle_cls=True, lang=lang, show_log=False)
+
+
+@functools.lru_cache(maxsize=1)
+def _onnx_ocr():
+    # PaddleOCR's det/cls/rec models exported to ONNX, run by onnxruntime
+    from rapidocr_onnxruntime import RapidOCR
+
+    return RapidOCR()
+
+
+def _upscale(gray):
+    return cv2.resize(gray, None, fx=2, fy=2, interpolation=cv2.INTER_CUBIC)
+
+
+def _poor_read(ocr_results) -> bool:
+    confs = [float(conf) for _, _, conf in ocr_results]
+    return (
+        len(confs) < _RETRY_MIN_RESULTS
+        or sum(confs) / len(confs) < _RETRY_MIN_MEAN_CONF
+    )
+
+
+def _keep_confident(pairs, min_conf: float) -> list[dict]:
+    """Build result dicts for (text, conf) pairs at or above min_conf."""
+    threshold = float(min_conf)
+    return [
+        {"text": text, "confidence": conf}
+        for text, conf in ((t, float(c)) for t, c in pairs)
+        if conf >= threshold
+    ]
+
 
 def extract_text(
     image_path: str,
@@ -9,12 +78,23 @@ def extract_text(
     lang_mode: str = "en",
     min_conf: float = 0.0,
     save_json: str | None = None,
+    image_bytes: bytes | None = None,
 ):
-    image_path = Path(image_path)
-    if not image_path.exists():
-        raise FileNotFoundError(f"Image not found: {image_path}")
-
-    img = cv2.imread(str(image_path))
+    # EasyOCR only ever sees grayscale, so decode straight to one channel
+    # and skip the 3-channel buffer; PaddleOCR / ONNX still get BGR.
+    flag = (
+        cv2.IMREAD_COLOR if engine in ("paddle", "onnx") else cv2.IMREAD_GRAYSCALE
+    )
+
+    if image_bytes is not None:
+        # In-memory upload: decode the encoded bytes directly into an
+        # ndarray, no temp file round-trip. image_path is only a label.
+        img = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), flag)
+    else:
+        image_path = Path(image_path)
+        if not image_path.exists():
+            raise FileNotFoundError(f"Image not found: {image_path}")
+        img = cv2.imread(str(image_path), flag)
     if img is None:
         raise ValueError("Failed to read image.")
 
@@ -36,39 +116,74 @@ def extract_text(
             if lang_mode == "en"
             else (["ar"] if lang_mode == "ar" else ["en", "ar"])
         )
-        reader = easyocr.Reader(langs, gpu=False)
+        with _MODEL_LOCK:
+            reader = _easy_reader(tuple(langs))
 
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        gray = cv2.resize(gray, None, fx=2, fy=2, interpolation=cv2.INTER_CUBIC)
-
-        ocr_results = reader.readtext(gray, detail=1)
-        for _, text, conf in ocr_results:
-            if float(conf) >= float(min_conf):
-                results.append({"text": text, "confidence": float(conf)})
+        gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        if max(gray.shape[:2]) < _UPSCALE_BELOW_PX:
+            ocr_results = reader.readtext(_upscale(gray), detail=1)
+        else:
+            ocr_results = reader.readtext(gray, detail=1)
+            if _poor_read(ocr_results):
+                ocr_results = reader.readtext(_upscale(gray), detail=1)
+        results = _keep_confident(
+            ((text, conf) for _, text, conf in ocr_results), min_conf
+        )
 
         used_engine = "easy"
 
     def run_paddle(paddle_lang: str):
         nonlocal results, used_engine, note
-        try:
-            from paddleocr import PaddleOCR
-        except ModuleNotFoundError:
+        if "paddle" not in _MISSING_BACKENDS:
+            try:
+                import paddleocr  # noqa: F401
+            except ModuleNotFoundError:
+                _MISSING_BACKENDS.add("paddle")
+        if "paddle" in _MISSING_BACKENDS:
             note = "PaddleOCR is not installed. Falling back to EasyOCR."
             run_easy()
             return
 
-        ocr = PaddleOCR(use_angle_cls=True, lang=paddle_lang, show_log=False)
-        ocr_results = ocr.ocr(img, cls=True)
+        with _MODEL_LOCK:
+            ocr = _paddle_ocr(paddle_lang)
+        with _PADDLE_INFER_LOCK:
+            ocr_results = ocr.ocr(img, cls=True)
 
         if ocr_results and ocr_results[0]:
-            for line in ocr_results[0]:
-                text, conf = line[1]
-                if float(conf) >= float(min_conf):
-                    results.append({"text": text, "confidence": float(conf)})
+            results = _keep_confident((line[1] for line in ocr_results[0]), min_conf)
 
         used_engine = "paddle"
 
-    if engine == "paddle":
+    def run_onnx():
+        nonlocal results, used_engine, note
+        if lang_mode != "en":
+            # RapidOCR's bundled models are Chinese/English only
+            note = "ONNX backend has no Arabic model. Falling back to EasyOCR."
+            run_easy()
+            return
+        if "onnx" not in _MISSING_BACKENDS:
+            try:
+                import rapidocr_onnxruntime  # noqa: F401
+            except ModuleNotFoundError:
+                _MISSING_BACKENDS.add("onnx")
+        if "onnx" in _MISSING_BACKENDS:
+            note = "rapidocr-onnxruntime is not installed. Falling back to EasyOCR."
+            run_easy()
+            return
+
+        with _MODEL_LOCK:
+            ocr = _onnx_ocr()
+        ocr_results, _ = ocr(img)
+
+        results = _keep_confident(
+            ((text, conf) for _, text, conf in ocr_results or []), min_conf
+        )
+
+        used_engine = "onnx"
+
+    if engine == "onnx":
+        run_onnx()
+    elif engine == "paddle":
         if lang_mode == "ar":
             run_paddle("arabic")
         else:
@@ -25,14 +25,17 @@ def generate_sanad_report(payload: dict) -> bytes:
         c.drawString(x, y, s)
 
     def wrap_lines(s: str, max_len: int = 95):
-        words = s.split()
-        lines, line = [], []
-        for word in words:
-            if len(" ".join(line + [word])) <= max_len:
+        # track the running line length instead of re-joining the line
+        # for every word (quadratic in the line length)
+        lines, line, line_len = [], [], 0
+        for word in s.split():
+            new_len = line_len + len(word) + (1 if line else 0)
+            if new_len <= max_len:
                 line.append(word)
+                line_len = new_len
             else:
                 lines.append(" ".join(line))
-                line = [word]
+                line, line_len = [word], len(word)
         if line:
             lines.append(" ".join(line))
         return lines
@@ -2,27 +2,68 @@ import io
 import math
 import re
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Union
 
-import pandas as pd
+if TYPE_CHECKING:  # only used in annotations; pandas loads with the BoM
+    import pandas as pd
 
 
-@dataclass
+# BoM column aliases, matched case-insensitively
+VOC_COLS = ["Voc_STC", "Voc", "Module_Voc", "PV_Voc"]
+TEMP_COEFF_COLS = ["TempCoeff", "Temp_Coeff", "Voc_TempCoeff", "TempCoeff_Voc"]
+MPS_COLS = ["ModulesPerString", "Modules_per_string", "MPS", "PanelsPerString"]
+INV_VMAX_COLS = ["Inverter_Vmax", "InverterVmax", "DC_Vmax", "Vmax_DC"]
+INV_NAME_COLS = ["Inverter", "InverterModel", "INV_Model", "Inverter_Model"]
+
+
+@dataclass(slots=True)
 class CheckStatus:
     level: str  # "PASS" | "WARN" | "FAIL" | "INFO"
     title: str
     details: List[str]
 
 
-def smart_find_col(df: pd.DataFrame, candidates: List[str]) -> Optional[str]:
-    cols = {c.lower(): c for c in df.columns}
+def _normalize_header(col) -> str:
+    """Case-fold a header and collapse stray whitespace/newlines."""
+    return " ".join(str(col).split()).lower()
+
+
+def _lower_columns(df: "pd.DataFrame") -> Dict[str, str]:
+    return {_normalize_header(c): c for c in df.columns}
+
+
+def smart_find_col(
+    df: "pd.DataFrame",
+    candidates: List[str],
+    cols: Optional[Dict[str, str]] = None,
+) -> Optional[str]:
+    # callers resolving several aliases pass one shared map via `cols`
+    if cols is None:
+        cols = _lower_columns(df)
     for cand in candidates:
         if cand.lower() in cols:
             return cols[cand.lower()]
     return None
 
 
-def extract_bom_signals(df: pd.DataFrame) -> Dict:
+def _first_valid(df: "pd.DataFrame", col: Optional[str], default, cast):
+    # first non-null cell without materializing a dropna() copy
+    if col is None:
+        return cast(default)
+    s = df[col]
+    idx = s.first_valid_index()
+    if idx is None:
+        return cast(default)
+    value = s.at[idx]
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        raise ValueError(
+            f"BoM column '{col}' holds {value!r}, which is not a plain number."
+        ) from None
+
+
+def extract_bom_signals(df: "pd.DataFrame") -> Dict:
     """
     Extract signals from BoM with flexible column names.
     Required for checks:
@@ -31,44 +72,21 @@ def extract_bom_signals(df: pd.DataFrame) -> Dict:
       - Modules per string
       - Inverter DC max voltage
       - Inverter model/name (optional)
+    Raises ValueError naming the column if a numeric cell cannot be parsed
+    (e.g. "49.5 V").
     """
-    c_voc = smart_find_col(df, ["Voc_STC", "Voc", "Module_Voc", "PV_Voc"])
-    c_tc = smart_find_col(
-        df, ["TempCoeff", "Temp_Coeff", "Voc_TempCoeff", "TempCoeff_Voc"]
-    )
-    c_mps = smart_find_col(
-        df, ["ModulesPerString", "Modules_per_string", "MPS", "PanelsPerString"]
-    )
-    c_inv = smart_find_col(df, ["Inverter_Vmax", "InverterVmax", "DC_Vmax", "Vmax_DC"])
-    c_inv_name = smart_find_col(
-        df, ["Inverter", "InverterModel", "INV_Model", "Inverter_Model"]
-    )
-
-    voc_stc = (
-        float(df[c_voc].dropna().iloc[0])
-        if c_voc and not df[c_voc].dropna().empty
-        else 49.5
-    )
-    temp_coeff = (
-        float(df[c_tc].dropna().iloc[0])
-        if c_tc and not df[c_tc].dropna().empty
-        else -0.0029
-    )
-    mps = (
-        int(df[c_mps].dropna().iloc[0])
-        if c_mps and not df[c_mps].dropna().empty
-        else 22
-    )
-    inverter_vmax = (
-        float(df[c_inv].dropna().iloc[0])
-        if c_inv and not df[c_inv].dropna().empty
-        else 1100.0
-    )
-    inverter_name = (
-        str(df[c_inv_name].dropna().iloc[0])
-        if c_inv_name and not df[c_inv_name].dropna().empty
-        else "Inverter model not specified"
-    )
+    cols = _lower_columns(df)
+    c_voc = smart_find_col(df, VOC_COLS, cols)
+    c_tc = smart_find_col(df, TEMP_COEFF_COLS, cols)
+    c_mps = smart_find_col(df, MPS_COLS, cols)
+    c_inv = smart_find_col(df, INV_VMAX_COLS, cols)
+    c_inv_name = smart_find_col(df, INV_NAME_COLS, cols)
+
+    voc_stc = _first_valid(df, c_voc, 49.5, float)
+    temp_coeff = _first_valid(df, c_tc, -0.0029, float)
+    mps = _first_valid(df, c_mps, 22, int)
+    inverter_vmax = _first_valid(df, c_inv, 1100.0, float)
+    inverter_name = _first_valid(df, c_inv_name, "Inverter model not specified", str)
 
     # normalize percent coefficients
     if abs(temp_coeff) > 0.05:
@@ -92,47 +110,69 @@ def extract_bom_signals(df: pd.DataFrame) -> Dict:
     }
 
 
-def try_extract_from_sld(pdf_bytes: bytes) -> Dict:
+# SLD signal patterns in priority order (most specific first), compiled once
+_SLD_VMAX_RES = [
+    re.compile(p, re.IGNORECASE)
+    for p in (
+        r"(?:DC\s*MAX|DC\s*MAXIMUM|VDC\s*MAX|V\s*MAX|MAX\s*DC)\s*[:=]?\s*(\d{3,4})\s*V",
+        r"(?:Vmax|V\s*max)\s*[:=]?\s*(\d{3,4})\s*V",
+        r"(\d{3,4})\s*V\s*(?:DC\s*MAX|VDC\s*MAX|MAX\s*DC)",
+    )
+]
+_SLD_MPS_RES = [
+    re.compile(p, re.IGNORECASE)
+    for p in (
+        r"(?:MODULES\s*/\s*STRING|MODULES\s*PER\s*STRING|MOD\s*/\s*STR)\s*[:=]?\s*(\d{1,3})",
+        r"\bMPS\b\s*[:=]?\s*(\d{1,3})",
+        r"(?:STRING)\s*[:=]?\s*(\d{1,3})\s*(?:MODULES|MOD)",
+    )
+]
+_SLD_FIELDS = (
+    ("inverter_vmax", _SLD_VMAX_RES, float),
+    ("modules_per_string", _SLD_MPS_RES, int),
+)
+
+
+def _iter_sld_pages(pdf: Union[str, bytes], max_pages: int = 3):
+    """Yield the text layer of the first pages one at a time."""
+    import PyPDF2  # type: ignore
+
+    reader = PyPDF2.PdfReader(
+        io.BytesIO(pdf) if isinstance(pdf, (bytes, bytearray)) else pdf
+    )
+    for i in range(min(len(reader.pages), max_pages)):
+        yield reader.pages[i].extract_text() or ""
+
+
+def try_extract_from_sld(pdf: Union[str, bytes]) -> Dict:
     """
     Best-effort PDF text extraction (first pages) + regex.
+    Accepts a file path or the raw PDF bytes.
     Returns: inverter_vmax, modules_per_string, notes
     """
     out = {"inverter_vmax": None, "modules_per_string": None, "notes": ""}
 
     try:
-        import PyPDF2  # type: ignore
-
-        reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
-        text = ""
-        for i in range(min(len(reader.pages), 3)):
-            text += "\n" + (reader.pages[i].extract_text() or "")
-
-        if not text.strip():
+        # index of the pattern behind each value; lower is more specific
+        rank = {key: len(patterns) for key, patterns, _ in _SLD_FIELDS}
+        has_text = False
+        for page in _iter_sld_pages(pdf):
+            has_text = has_text or bool(page.strip())
+            # the most specific pattern wins; among equals the earlier page
+            for key, patterns, cast in _SLD_FIELDS:
+                for i, pat in enumerate(patterns[: rank[key]]):
+                    m = pat.search(page)
+                    if m:
+                        out[key] = cast(m.group(1))
+                        rank[key] = i
+                        break
+            if not any(rank.values()):
+                break  # every field hit its top pattern; skip later pages
+
+        if not has_text:
             out["notes"] = "SLD text extraction empty (scan/image likely)."
             return out
 
-        vmax_patterns = [
-            r"(?:DC\s*MAX|DC\s*MAXIMUM|VDC\s*MAX|V\s*MAX|MAX\s*DC)\s*[:=]?\s*(\d{3,4})\s*V",
-            r"(?:Vmax|V\s*max)\s*[:=]?\s*(\d{3,4})\s*V",
-            r"(\d{3,4})\s*V\s*(?:DC\s*MAX|VDC\s*MAX|MAX\s*DC)",
-        ]
-        for pat in vmax_patterns:
-            m = re.search(pat, text, flags=re.IGNORECASE)
-            if m:
-                out["inverter_vmax"] = float(m.group(1))
-                break
-
-        mps_patterns = [
-            r"(?:MODULES\s*/\s*STRING|MODULES\s*PER\s*STRING|MOD\s*/\s*STR)\s*[:=]?\s*(\d{1,3})",
-            r"\bMPS\b\s*[:=]?\s*(\d{1,3})",
-            r"(?:STRING)\s*[:=]?\s*(\d{1,3})\s*(?:MODULES|MOD)",
-        ]
-        for pat in mps_patterns:
-            m = re.search(pat, text, flags=re.IGNORECASE)
-            if m:
-                out["modules_per_string"] = int(m.group(1))
-                break
-
         out["notes"] = "SLD signals extracted from text (best-effort)."
         return out
 
@@ -148,20 +188,20 @@ def compare_bom_vs_sld(bom_sig: Dict, sld_sig: Dict) -> CheckStatus:
     if sld_sig.get("inverter_vmax") is None:
         gaps.append("Inverter DC max voltage not detected in SLD.")
     else:
-        if (
-            abs(float(bom_sig["inverter_vmax"]) - float(sld_sig["inverter_vmax"]))
-            > 1e-6
-        ):
+        bom_vmax = float(bom_sig["inverter_vmax"])
+        sld_vmax = float(sld_sig["inverter_vmax"])
+        if abs(bom_vmax - sld_vmax) > 1e-6:
             mismatch.append(
-                f"Inverter DC max differs (BoM {bom_sig['inverter_vmax']:.0f} V vs SLD {float(sld_sig['inverter_vmax']):.0f} V)."
+                f"Inverter DC max differs (BoM {bom_vmax:.0f} V vs SLD {sld_vmax:.0f} V)."
             )
 
     if sld_sig.get("modules_per_string") is None:
         gaps.append("Modules/string not detected in SLD.")
     else:
-        if int(bom_sig["modules_per_string"]) != int(sld_sig["modules_per_string"]):
+        sld_mps = int(sld_sig["modules_per_string"])
+        if int(bom_sig["modules_per_string"]) != sld_mps:
             mismatch.append(
-                f"Modules/string differs (BoM {bom_sig['modules_per_string']} vs SLD {int(sld_sig['modules_per_string'])})."
+                f"Modules/string differs (BoM {bom_sig['modules_per_string']} vs SLD {sld_mps})."
             )
 
     if mismatch:
@@ -219,10 +259,14 @@ def climate_voltage_check(
             recs,
         )
 
-    # find safe MPS
-    suggested = mps
-    while suggested > 1 and (voc_cold * suggested) > vmax:
+    # find safe MPS: largest string length within vmax, clamped to [1, mps]
+    suggested = max(1, min(mps, math.floor(vmax / voc_cold)))
+    # the division can round either way right at the limit; settle it with
+    # the same product test the old loop used
+    if suggested > 1 and (voc_cold * suggested) > vmax:
         suggested -= 1
+    elif suggested < mps and (voc_cold * (suggested + 1)) <= vmax:
+        suggested += 1
 
     recs.append(
         f"Reduce modules/string from {mps} to {suggested} to keep string Voc at Tmin ≤ {vmax:.0f} V."
@@ -243,6 +287,17 @@ def climate_voltage_check(
     )
 
 
+# Items the current inputs can never cover; an immutable constant instead of
+# a fresh list on every snapshot.
+_UNVALIDATED_GAPS = (
+    "Protection coordination (DC fuses/breakers, SPD type and ratings) not validated from current inputs.",
+    "Labeling and isolation (DC isolators, emergency shutdown labels) require drawing confirmation.",
+    "Cable sizing/derating (installation method, ambient, grouping) not validated from current inputs.",
+    "Earthing/bonding continuity and conductor sizing not validated from current inputs.",
+    "Fire safety routing and rooftop requirements require site/fire review.",
+)
+
+
 def saudi_standards_snapshot(
     climate_ok: bool, bom_sld_level: str
 ) -> Tuple[List[str], List[str]]:
@@ -275,14 +330,6 @@ def saudi_standards_snapshot(
     else:
         gaps.append("BoM and SLD values mismatch. Resolve before procurement/approval.")
 
-    gaps.extend(
-        [
-            "Protection coordination (DC fuses/breakers, SPD type and ratings) not validated from current inputs.",
-            "Labeling and isolation (DC isolators, emergency shutdown labels) require drawing confirmation.",
-            "Cable sizing/derating (installation method, ambient, grouping) not validated from current inputs.",
-            "Earthing/bonding continuity and conductor sizing not validated from current inputs.",
-            "Fire safety routing and rooftop requirements require site/fire review.",
-        ]
-    )
+    gaps.extend(_UNVALIDATED_GAPS)
 
     return compliant, gaps
@@ -101,26 +101,17 @@ def _inject_css():
     )
 
 
-def _level_class(level: str) -> str:
-    level = (level or "WARN").upper()
-    if level == "PASS":
-        return "ok"
-    if level == "WARN":
-        return "warn"
-    if level == "FAIL":
-        return "crit"
-    return "warn"
-
-
-def _badge_text(level: str) -> str:
-    level = (level or "WARN").upper()
-    if level == "PASS":
-        return "MATCH"
-    if level == "WARN":
-        return "WARNING"
-    if level == "FAIL":
-        return "CRITICAL"
-    return ""
+# level -> (card css class, badge label); unknown levels render as warn, no badge
+_LEVEL_STYLE = {
+    "PASS": ("ok", "MATCH"),
+    "WARN": ("warn", "WARNING"),
+    "FAIL": ("crit", "CRITICAL"),
+}
+_UNKNOWN_LEVEL_STYLE = ("warn", "")
+
+
+def _level_style(level: str) -> tuple:
+    return _LEVEL_STYLE.get((level or "WARN").upper(), _UNKNOWN_LEVEL_STYLE)
 
 
 def _clean_lines(lines):
@@ -138,8 +129,7 @@ def _clean_lines(lines):
 
 
 def render_card(title, subtitle, level, bullets):
-    cls = _level_class(level)
-    badge = _badge_text(level)
+    cls, badge = _level_style(level)
 
     st.markdown(f'<div class="sg-card2 {cls}">', unsafe_allow_html=True)
 
@@ -180,6 +170,19 @@ def render_kpis(items):
 
 
 
+# SLD extraction depends only on the PDF bytes, so key it on their SHA-256
+# (set by save_upload); the path is not part of the key.
+@st.cache_data(ttl=3600, max_entries=32, show_spinner=False)
+def _sld_signals(sha256: str, _path: str) -> dict:
+    return try_extract_from_sld(_path)
+
+
+# The PDF is rebuilt only when the report content changes, not on every rerun
+@st.cache_data(max_entries=16, show_spinner=False)
+def _report_pdf(payload: dict) -> bytes:
+    return generate_sanad_report(payload)
+
+
 def render_stage2():
     _inject_css()
 
@@ -189,16 +192,16 @@ def render_stage2():
     st.markdown('<div class="sg-divider"></div>', unsafe_allow_html=True)
 
     bom_df = st.session_state.get("bom_df")
-    sld_bytes = st.session_state.get("sld_pdf_bytes")
+    sld_path = st.session_state.get("sld_pdf_path")
     tmin = st.session_state.get("tmin")
 
-    if bom_df is None or sld_bytes is None or tmin is None:
+    if bom_df is None or sld_path is None or tmin is None:
         st.error("Missing inputs. Complete Stage 1 first.")
         return
 
     # signals
     bom_sig = extract_bom_signals(bom_df)
-    sld_sig = try_extract_from_sld(sld_bytes)
+    sld_sig = _sld_signals(st.session_state.get("sld_pdf_sha256"), sld_path)
 
     # 1) BoM vs SLD
     doc = compare_bom_vs_sld(bom_sig, sld_sig)
@@ -276,7 +279,7 @@ def render_stage2():
         "recommendations": (recs or []),
     }
 
-    pdf = generate_sanad_report(payload)
+    pdf = _report_pdf(payload)
 
     st.download_button(
         "Download SANAD report (PDF)",
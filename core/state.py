@@ -1,3 +1,9 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
 import streamlit as st
 
 
@@ -14,13 +20,82 @@ def init_state():
     st.session_state.setdefault("tmin_method", None)
 
     st.session_state.setdefault("sld_pdf_name", None)
-    st.session_state.setdefault("sld_pdf_bytes", None)
+    st.session_state.setdefault("sld_pdf_path", None)
+    st.session_state.setdefault("sld_pdf_sha256", None)
 
     st.session_state.setdefault("bom_df", None)
     st.session_state.setdefault("bom_name", None)
 
 
+# Everything Stage 2 needs before "Continue" is enabled
+_REQUIRED_FOR_REVIEW = ("place", "lat", "lon", "tmin", "sld_pdf_path", "bom_df")
+
+
+def stage1_ready() -> bool:
+    # generator form stops at the first missing input
+    return all(st.session_state.get(k) is not None for k in _REQUIRED_FOR_REVIEW)
+
+
+def _discard(path):
+    if path and os.path.exists(path):
+        os.remove(path)
+
+
+def _upload_dir() -> str:
+    # One TemporaryDirectory per session, held in session state. Its
+    # finalizer deletes the directory once Streamlit drops the session
+    # (or the process exits), so sessions that simply end leave no
+    # spooled uploads behind in /tmp.
+    d = st.session_state.get("_upload_dir")
+    if d is None:
+        d = tempfile.TemporaryDirectory(prefix="sanad-")
+        st.session_state["_upload_dir"] = d
+    return d.name
+
+
+def _sha256(uf) -> str:
+    # hashlib hands the chunks to OpenSSL (SHA-NI where available)
+    h = hashlib.sha256()
+    uf.seek(0)
+    for chunk in iter(lambda: uf.read(1 << 20), b""):
+        h.update(chunk)
+    return h.hexdigest()
+
+
+def save_upload(prefix: str, uf):
+    """
+    Spool an uploaded file to a temp file in 1 MiB chunks and keep only
+    its name, path and SHA-256 in session state (<prefix>_name /
+    <prefix>_path / <prefix>_sha256). Reruns with the same upload, and
+    re-uploads of identical bytes, are skipped.
+    """
+    # Streamlit keeps the same UploadedFile (and file_id) across reruns and
+    # issues a new file_id for every upload, even of a same-name same-size
+    # revision, so it tells exactly whether anything changed.
+    sig = uf.file_id
+    old_path = st.session_state.get(f"{prefix}_path")
+    if old_path and st.session_state.get(f"_sig_{prefix}") == sig:
+        return
+
+    digest = _sha256(uf)
+    st.session_state[f"{prefix}_name"] = uf.name
+    st.session_state[f"_sig_{prefix}"] = sig
+    if old_path and st.session_state.get(f"{prefix}_sha256") == digest:
+        return
+
+    uf.seek(0)
+    with tempfile.NamedTemporaryFile(
+        delete=False, dir=_upload_dir(), suffix=Path(uf.name).suffix
+    ) as tf:
+        shutil.copyfileobj(uf, tf, length=1 << 20)
+
+    st.session_state[f"{prefix}_path"] = tf.name
+    st.session_state[f"{prefix}_sha256"] = digest
+    _discard(old_path)
+
+
 def reset_all():
+    _discard(st.session_state.get("sld_pdf_path"))
     for k in [
         "stage",
         "geo_results",
@@ -31,7 +106,9 @@ def reset_all():
         "tmin",
         "tmin_method",
         "sld_pdf_name",
-        "sld_pdf_bytes",
+        "sld_pdf_path",
+        "sld_pdf_sha256",
+        "_sig_sld_pdf",
         "bom_df",
         "bom_name",
     ]:
@@ -1,6 +1,6 @@
 import importlib.util
 import json
-import tempfile
+import os
 from pathlib import Path
 
 import streamlit as st
@@ -16,32 +16,44 @@ if not ENGINE_FILE.exists():
     st.error(f"Missing file: {ENGINE_FILE.name}")
     st.stop()
 
-spec = importlib.util.spec_from_file_location("ocr_engine", str(ENGINE_FILE))
-ocr_engine = importlib.util.module_from_spec(spec)
-spec.loader.exec_module(ocr_engine)
-extract_text = ocr_engine.extract_text
+
+# Load the engine module once per process instead of re-executing it
+# (and its cv2 import) on every Streamlit rerun.
+@st.cache_resource(show_spinner=False)
+def _load_engine():
+    spec = importlib.util.spec_from_file_location("ocr_engine", str(ENGINE_FILE))
+    ocr_engine = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(ocr_engine)
+    return ocr_engine
+
+
+extract_text = _load_engine().extract_text
+
+# Backend comes from SANAD_OCR_BACKEND (easy | paddle | onnx); the ONNX
+# backend only has English models and falls back to EasyOCR otherwise.
+OCR_BACKEND = os.getenv("SANAD_OCR_BACKEND", "easy")
+LANG_MODES = {"English + Arabic": "en+ar", "English": "en", "Arabic": "ar"}
 
 uploaded_file = st.file_uploader(
     "Upload image (JPG / PNG)", type=["jpg", "jpeg", "png"]
 )
+lang_label = st.selectbox("Text language", list(LANG_MODES))
 
 if uploaded_file:
-    suffix = "." + uploaded_file.name.split(".")[-1].lower()
-    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-        tmp.write(uploaded_file.read())
-        image_path = tmp.name
-
     if st.button("Extract Text"):
         with st.spinner("Processing image..."):
             result = extract_text(
-                image_path=image_path,
-                engine="easy",
-                lang_mode="en+ar",
+                image_path=uploaded_file.name,
+                image_bytes=uploaded_file.getvalue(),
+                engine=OCR_BACKEND,
+                lang_mode=LANG_MODES[lang_label],
                 min_conf=0.0,
                 save_json=None,
             )
 
         st.success(f"Extracted {result['count']} text items")
+        if result.get("note"):
+            st.info(result["note"])
 
         for i, item in enumerate(result["texts"], start=1):
             st.write(f"{i}. {item['text']}")
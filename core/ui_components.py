@@ -15,11 +15,9 @@ def header(project_name: str):
     st.markdown('<div class="sg-divider"></div>', unsafe_allow_html=True)
 
 
-def render_map(
-    lat: float, lon: float, label: str | None, height: int = 320, zoom: int = 6
-):
+@st.cache_data(max_entries=64, show_spinner=False)
+def map_html(lat: float, lon: float, label: str | None, zoom: int = 6) -> str:
     import folium
-    import streamlit.components.v1 as components
 
     m = folium.Map(
         location=[lat, lon],
@@ -57,7 +55,16 @@ def render_map(
         tooltip=tip,
     ).add_to(m)
 
-    html = m.get_root().render()
+    return m.get_root().render()
+
+
+def render_map(
+    lat: float, lon: float, label: str | None, height: int = 320, zoom: int = 6
+):
+    import streamlit.components.v1 as components
+
+    # Quantized coords so re-renders of the same view reuse the cached HTML
+    html = map_html(round(lat, 3), round(lon, 3), label, zoom)
     components.html(html, height=height, scrolling=False)
 
 
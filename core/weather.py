@@ -1,7 +1,6 @@
 import math
 from datetime import date, timedelta
 
-import pandas as pd
 import requests
 
 
@@ -48,6 +47,8 @@ def fetch_design_tmin(lat: float, lon: float, years: int = 10):
     if not vals:
         return None, "Archive: no Tmin data"
 
+    import pandas as pd  # deferred: only this archive lookup needs it
+
     s = pd.Series(vals, dtype="float64")
     p01 = float(s.quantile(0.01))
     return math.floor(p01), f"Archive: {years}y Tmin (1st percentile, floored)"